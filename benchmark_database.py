@@ -0,0 +1,77 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+import app
+
+# Vergleicht die Schreibrate gleichzeitiger Tasks: eine neue Verbindung pro Aufruf (Rollback-Journal, bisheriges Verhalten),
+# den Verbindungspool (eine Verbindung pro Thread, WAL, abgestimmte Pragmas) mit einer Transaktion pro Seite und den
+# Schreib-Thread (Write-Behind), der die Seiten aller Threads in gemeinsamen Transaktionen speichert.
+# Aufruf: python benchmark_database.py [--threads 32] [--writes 50]
+
+
+def legacy_connect_db():
+    conn = sqlite3.connect(app.DATABASE_FILE)
+    conn.create_function('wc_decompress', 2, app.decompress_body, deterministic=True)
+    return conn
+
+
+def run_writers(threads, writes, asynchronous=False):
+    results = []
+    lock = threading.Lock()
+
+    def write(number):
+        pending = []
+        for page in range(writes):
+            text = f"Vertrag {number} Angebot {page} " + "Annahme Frist Kündigung " * 50
+            arguments = (f"https://www.example.com/{number}/{page}", "example.com", f"Seite {number}/{page}", None, None, None, f"<p>{text}</p>", text, None)
+            if asynchronous:
+                pending.append(app.save_to_db_async(*arguments, keyword_text=text)) # Wie im Crawl: nicht auf jeden Commit warten
+            else:
+                pending.append(app.save_to_db(*arguments, keyword_text=text))
+        stored = [result.result() if asynchronous else result for result in pending]
+        with lock:
+            results.extend(stored)
+
+    workers = [threading.Thread(target=write, args=(number,)) for number in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, results.count(True), results.count(False)
+
+
+def measure(label, threads, writes, mode):
+    writer = app.WriteBehindWriter({**app.WRITE_BEHIND_CONFIG, 'enabled': mode == 'write_behind'})
+    with tempfile.TemporaryDirectory() as temp_dir, patch('app.DATABASE_FILE', os.path.join(temp_dir, 'benchmark.db')), patch('app.write_behind', writer):
+        if mode == 'legacy':
+            with patch('app.connect_db', legacy_connect_db):
+                app.init_db()
+                elapsed, stored, failed = run_writers(threads, writes)
+        else:
+            app.init_db()
+            elapsed, stored, failed = run_writers(threads, writes, asynchronous=mode == 'write_behind')
+            writer.shutdown()
+            app.db_connections.close_all()
+    print(f"{label}: {stored / elapsed:.0f} Schreibvorgänge/s ({stored} gespeichert, {failed} fehlgeschlagen, {elapsed:.2f} s)")
+    return stored / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der SQLite-Schreibrate mit vielen gleichzeitigen Tasks.")
+    parser.add_argument("--threads", type=int, default=32, help="Anzahl gleichzeitiger Schreib-Threads.")
+    parser.add_argument("--writes", type=int, default=50, help="Anzahl gespeicherter Seiten pro Thread.")
+    args = parser.parse_args()
+
+    legacy_rate = measure("Neue Verbindung pro Aufruf (Rollback-Journal)", args.threads, args.writes, 'legacy')
+    pooled_rate = measure(f"Verbindungspool ({app.SQLITE_CONFIG['journal_mode']}, synchronous={app.SQLITE_CONFIG['synchronous']})", args.threads, args.writes, 'pooled')
+    write_behind_rate = measure("Verbindungspool + Schreib-Thread (Sammel-Transaktionen)", args.threads, args.writes, 'write_behind')
+    print(f"Beschleunigung Verbindungspool: {pooled_rate / legacy_rate:.1f}x, mit Schreib-Thread: {write_behind_rate / legacy_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from urllib.request import pathname2url
+from bs4 import BeautifulSoup
+import app
+
+# Vergleicht die bisherige Extraktion (ein BeautifulSoup-Parse pro Feld) mit der Single-Parse-Pipeline.
+# Aufruf: python benchmark_extraction.py [--limit 200] [--repeat 3]
+
+SYNTHETIC_PARAGRAPH = "<p>§ {0} Der Vertrag kommt durch Angebot und Annahme zustande. <a href='/bgb/__{0}.html'>Weiter</a></p>"
+
+
+def legacy_extract(html_content, css_selectors):
+    """Bisheriges Vorgehen: jede Extraktion parst das Dokument neu (Text für die Keywords ein zweites Mal)."""
+    def text():
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for tag in soup(list(app.TEXT_EXCLUDED_TAGS)):
+            tag.decompose()
+        return soup.get_text(separator='\n', strip=True)
+
+    text_content = text()
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title_tag = soup.find('title')
+    title = title_tag.string.strip() if title_tag and title_tag.string else None
+    soup = BeautifulSoup(html_content, 'html.parser')
+    meta_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_description = meta_tag['content'].strip() if meta_tag and 'content' in meta_tag.attrs else None
+    soup = BeautifulSoup(html_content, 'html.parser')
+    h1_headings = [tag.get_text(strip=True) for tag in soup.find_all('h1')]
+    keywords_text = text()
+    css_data = app.extract_data_css(html_content, css_selectors, document=app.ParsedDocument(html_content))
+    soup = BeautifulSoup(html_content, 'html.parser')
+    links = [a['href'] for a in soup.find_all('a', href=True) if a.get('href')]
+    return text_content, title, meta_description, h1_headings, keywords_text, css_data, links
+
+
+def single_parse_extract(html_content, css_selectors):
+    document = app.parse_document(html_content)
+    return (document.text(), document.title(), document.meta_description(), document.h1_headings(), document.text(),
+            document.css_data(css_selectors), document.links(''))
+
+
+def copy_database(database_file):
+    """Kopiert die Datenbank schreibgeschützt in ein temporäres Verzeichnis, damit init_db() (Schema-Migration) nur die Kopie verändert."""
+    temp_dir = tempfile.mkdtemp(prefix='benchmark_')
+    copy_file = os.path.join(temp_dir, os.path.basename(database_file) or 'benchmark.db')
+    if os.path.exists(database_file):
+        source = sqlite3.connect(f"file:{pathname2url(os.path.abspath(database_file))}?mode=ro", uri=True)
+        target = sqlite3.connect(copy_file)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    return temp_dir, copy_file
+
+
+def load_pages(limit):
+    conn = app.connect_db()
+    try:
+        rows = conn.execute(f"SELECT {app.HTML_CONTENT_SQL} FROM web_content LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    pages = [row[0] for row in rows if row[0] and '<' in row[0]]
+    if pages:
+        return pages, app.DATABASE_FILE
+    # Leere Datenbank: synthetische Gesetzesseiten ähnlicher Größe verwenden
+    synthetic = []
+    for page_number in range(min(limit, 50)):
+        body = ''.join(SYNTHETIC_PARAGRAPH.format(page_number * 100 + i) for i in range(300))
+        synthetic.append(f"<html><head><title>Seite {page_number}</title><meta name='description' content='Gesetz {page_number}'></head>"
+                         f"<body><nav><a href='/'>Start</a></nav><h1>Abschnitt {page_number}</h1>{body}<footer>Impressum</footer></body></html>")
+    return synthetic, "synthetisch (webdata.db enthält keine Seiten)"
+
+
+def measure(function, pages, css_selectors, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html_content in pages:
+            function(html_content, css_selectors)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der HTML-Extraktion: mehrfaches Parsen gegen Single-Parse-Pipeline.")
+    parser.add_argument("--limit", type=int, default=200, help="Maximale Anzahl Seiten aus webdata.db.")
+    parser.add_argument("--repeat", type=int, default=3, help="Anzahl Wiederholungen; gemessen wird der beste Lauf.")
+    parser.add_argument("--db", type=str, default=app.DATABASE_FILE, help="SQLite-Datenbank mit gespeicherten Seiten (Standard aus config.yaml); wird nur schreibgeschützt gelesen und als temporäre Kopie migriert.")
+    parser.add_argument("--parser", type=str, default=None, choices=app.HTML_PARSER_BACKENDS, help="HTML-Parser-Backend der Single-Parse-Pipeline (Standard: html_parser aus config.yaml).")
+    parser.add_argument("--css-selectors", type=str, default='{"absatz": "p"}', help="CSS-Selektoren (JSON) für die Extraktion.")
+    args = parser.parse_args()
+
+    if args.parser:
+        app.HTML_PARSER = app.resolve_html_parser(args.parser)
+    temp_dir, app.DATABASE_FILE = copy_database(args.db)
+    try:
+        app.init_db()
+        pages, source = load_pages(args.limit)
+        if source == app.DATABASE_FILE:
+            source = args.db
+    finally:
+        app.db_connections.close_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    for html_content in pages:
+        if legacy_extract(html_content, args.css_selectors) != single_parse_extract(html_content, args.css_selectors):
+            raise SystemExit("Abweichende Extraktionsergebnisse zwischen beiden Verfahren.")
+
+    legacy_seconds = measure(legacy_extract, pages, args.css_selectors, args.repeat)
+    single_seconds = measure(single_parse_extract, pages, args.css_selectors, args.repeat)
+    total_kb = sum(len(html_content) for html_content in pages) / 1024
+    print(f"Quelle: {source} ({len(pages)} Seiten, {total_kb:.0f} KB)")
+    print(f"Mehrfaches Parsen (html.parser): {legacy_seconds:.3f} s ({legacy_seconds / len(pages) * 1000:.2f} ms/Seite)")
+    print(f"Single-Parse ({app.HTML_PARSER}): {single_seconds:.3f} s ({single_seconds / len(pages) * 1000:.2f} ms/Seite)")
+    print(f"Beschleunigung: {legacy_seconds / single_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
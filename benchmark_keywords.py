@@ -0,0 +1,109 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from urllib.request import pathname2url
+from collections import Counter
+from nltk.corpus import stopwords
+import app
+
+# Vergleicht die bisherige Keyword-Extraktion (Stopwörter pro Aufruf, split()) mit der KeywordEngine.
+# Aufruf: python benchmark_keywords.py [--limit 500] [--repeat 3] [--stopwords "gesetz,absatz"]
+
+SYNTHETIC_SENTENCE = "§ {0} Der Vertrag kommt durch Angebot und Annahme zustande, sofern die Parteien (Käufer, Verkäufer) sich einigen."
+
+
+def legacy_extract_keywords(text_content, top_n=10, custom_stopwords=None):
+    """Bisheriges Vorgehen: Stopwort-Menge bei jedem Aufruf neu aufbauen, Tokenisierung per split()."""
+    if not text_content:
+        return []
+    try:
+        nltk_stopwords_de = set(stopwords.words('german'))
+    except LookupError:
+        nltk_stopwords_de = set()
+    all_stopwords = nltk_stopwords_de.union(set(app.DEFAULT_STOPWORDS))
+    if custom_stopwords:
+        all_stopwords.update(set(sw.strip().lower() for sw in custom_stopwords.split(',') if sw.strip().isalpha()))
+    words = [word for word in text_content.lower().split() if word.isalpha() and word not in all_stopwords and len(word) > 2]
+    return [word for word, count in Counter(words).most_common(top_n)]
+
+
+def copy_database(database_file):
+    """Kopiert die Datenbank schreibgeschützt in ein temporäres Verzeichnis, damit init_db() (Schema-Migration) nur die Kopie verändert."""
+    temp_dir = tempfile.mkdtemp(prefix='benchmark_')
+    copy_file = os.path.join(temp_dir, os.path.basename(database_file) or 'benchmark.db')
+    if os.path.exists(database_file):
+        source = sqlite3.connect(f"file:{pathname2url(os.path.abspath(database_file))}?mode=ro", uri=True)
+        target = sqlite3.connect(copy_file)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    return temp_dir, copy_file
+
+
+def load_texts(limit):
+    conn = app.connect_db()
+    try:
+        rows = conn.execute(f"SELECT {app.TEXT_CONTENT_SQL} FROM web_content LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    texts = [row[0] for row in rows if row[0]]
+    if texts:
+        return texts, app.DATABASE_FILE
+    # Leere Datenbank: synthetische Gesetzestexte ähnlicher Größe verwenden
+    synthetic = ['\n'.join(SYNTHETIC_SENTENCE.format(doc_number * 100 + i) for i in range(300)) for doc_number in range(min(limit, 200))]
+    return synthetic, "synthetisch (webdata.db enthält keine Seiten)"
+
+
+def measure(function, texts, custom_stopwords, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(texts, custom_stopwords)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_legacy(texts, custom_stopwords):
+    return [legacy_extract_keywords(text_content, 10, custom_stopwords) for text_content in texts]
+
+
+def run_engine(texts, custom_stopwords):
+    return app.keyword_engine.extract_many(texts, 10, custom_stopwords)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Keyword-Extraktion: bisherige Funktion gegen KeywordEngine (Dokumente/Sekunde).")
+    parser.add_argument("--limit", type=int, default=500, help="Maximale Anzahl Dokumente aus webdata.db.")
+    parser.add_argument("--repeat", type=int, default=3, help="Anzahl Wiederholungen; gemessen wird der beste Lauf.")
+    parser.add_argument("--db", type=str, default=app.DATABASE_FILE, help="SQLite-Datenbank mit gespeicherten Seiten (Standard aus config.yaml); wird nur schreibgeschützt gelesen und als temporäre Kopie migriert.")
+    parser.add_argument("--stopwords", type=str, default="gesetz,absatz", help="Benutzerdefinierte Stopwörter (kommagetrennt).")
+    args = parser.parse_args()
+
+    temp_dir, app.DATABASE_FILE = copy_database(args.db)
+    try:
+        app.init_db()
+        texts, source = load_texts(args.limit)
+        if source == app.DATABASE_FILE:
+            source = args.db
+    finally:
+        app.db_connections.close_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    app.keyword_engine.base_stopwords()  # Einmalige Initialisierung nicht mitmessen
+
+    legacy_seconds = measure(run_legacy, texts, args.stopwords, args.repeat)
+    engine_seconds = measure(run_engine, texts, args.stopwords, args.repeat)
+    total_kb = sum(len(text_content) for text_content in texts) / 1024
+    print(f"Quelle: {source} ({len(texts)} Dokumente, {total_kb:.0f} KB Text)")
+    print(f"Bisherige Funktion: {len(texts) / legacy_seconds:.0f} Dokumente/s")
+    print(f"KeywordEngine: {len(texts) / engine_seconds:.0f} Dokumente/s")
+    print(f"Beschleunigung: {legacy_seconds / engine_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
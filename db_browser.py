@@ -17,9 +17,15 @@ def check_api_health(api_key):
         st.error(f"API Health Check fehlgeschlagen: {e}")
         return False
 
-def search_database(api_key, query, search_field="url"):
+SEARCH_FIELDS_WITHOUT_TEXT = "url,title,meta_description,domain,snippet,score" # Projektion ohne Textkörper (Standard im Browser)
+
+def search_database(api_key, query, search_field="url", limit=100, cursor=None, fields=None):
     headers = {'X-API-Key': api_key}
-    params = {'query': query, 'search_field': search_field}
+    params = {'query': query, 'search_field': search_field, 'limit': limit}
+    if cursor:
+        params['cursor'] = cursor
+    if fields:
+        params['fields'] = fields
     try:
         response = requests.get(API_ENDPOINT_SEARCH, headers=headers, params=params)
         response.raise_for_status() # This is good - it will throw an exception for 4xx/5xx errors
@@ -36,26 +42,48 @@ if api_key:
     if check_api_health(api_key): # API Health Check nach API Key Eingabe
         st.success("API-Key valid und API erreichbar.")
 
-        search_query = st.text_input("Suchbegriff:", placeholder="URL, Keyword, etc.")
-        search_field = st.selectbox("Suchfeld:", ["url", "title", "meta_description", "text_content", "domain"], index=0)
+        search_query = st.text_input("Suchbegriff:", placeholder='URL, Keyword, "exakte Phrase", vertrag* etc.')
+        search_field = st.selectbox("Suchfeld:", ["url", "title", "meta_description", "text_content", "domain", "all"], index=0)
+        result_limit = st.number_input("Maximale Trefferzahl:", min_value=1, max_value=1000, value=100)
+
+        load_text = st.checkbox("Volltext (text_content) mitladen", value=False)
 
         if st.button("Suchen"):
             if search_query:
-                search_results = search_database(api_key, search_query, search_field)
-                if search_results and 'data' in search_results:
-                    if search_results['data']:
-                        df = pd.DataFrame(search_results['data'])
-                        if 'text_content' in df.columns:
-                            df['text_content'] = df['text_content'].str.slice(0, 10000) + '...' # Zeige nur die ersten 200 Zeichen + "..."
-                        st.dataframe(df) # Zeige Ergebnisse als DataFrame
-                    else:
-                        st.info("Keine Ergebnisse gefunden.")
-                elif search_results and 'errors' in search_results:
-                    st.error(f"API Fehler: {search_results['errors']}")
-                else:
-                    st.error("Fehler bei der Suche. Überprüfen Sie die API-Verbindung und den API-Key.")
+                # Neue Suche: Seitenanfänge (Cursor) für Vor/Zurück merken
+                st.session_state['search'] = {'query': search_query, 'field': search_field, 'limit': int(result_limit), 'load_text': load_text}
+                st.session_state['search_cursors'] = [None]
             else:
                 st.warning("Bitte geben Sie einen Suchbegriff ein.")
+
+        if st.session_state.get('search'):
+            search = st.session_state['search']
+            cursors = st.session_state['search_cursors']
+            search_results = search_database(api_key, search['query'], search['field'], search['limit'], cursors[-1],
+                                             None if search['load_text'] else SEARCH_FIELDS_WITHOUT_TEXT)
+            if search_results and 'errors' not in search_results:
+                if search_results.get('data'):
+                    df = pd.DataFrame(search_results['data'])
+                    if df['snippet'].isna().all():
+                        df = df.drop(columns=['snippet', 'score']) # LIKE-Suche (Feld url): kein Ranking, keine Ausschnitte
+                    if 'text_content' in df.columns:
+                        df['text_content'] = df['text_content'].str.slice(0, 10000) + '...' # Zeige nur die ersten 200 Zeichen + "..."
+                    st.caption(f"Seite {len(cursors)}")
+                    st.dataframe(df) # Zeige Ergebnisse als DataFrame
+                else:
+                    st.info("Keine Ergebnisse gefunden.")
+                next_cursor = (search_results.get('pagination') or {}).get('next_cursor')
+                previous_column, next_column = st.columns(2)
+                if len(cursors) > 1 and previous_column.button("Vorherige Seite"):
+                    cursors.pop()
+                    st.rerun()
+                if next_cursor and next_column.button("Nächste Seite"):
+                    cursors.append(next_cursor)
+                    st.rerun()
+            elif search_results and 'errors' in search_results:
+                st.error(f"API Fehler: {search_results['errors']}")
+            else:
+                st.error("Fehler bei der Suche. Überprüfen Sie die API-Verbindung und den API-Key.")
     else:
         st.error("API nicht erreichbar oder API-Key ungültig. Bitte überprüfen Sie die API und den Key.")
 else:
@@ -0,0 +1,602 @@
+import unittest
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from aiohttp import web
+import app  # Import des Hauptprogramms
+
+
+class LocalTestServer:
+    """Kleiner aiohttp-Server in einem eigenen Thread für Abruf-Tests ohne Internetzugriff."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.runner = None
+        self.port = None
+
+    def start(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result(timeout=10)
+        return self
+
+    async def _start(self):
+        web_app = web.Application()
+        web_app.add_routes(self.routes)
+        self.runner = web.AppRunner(web_app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+
+
+class TestFetchEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.peers = []
+        self.user_agents = []
+
+        async def page(request):
+            self.peers.append(request.transport.get_extra_info('peername'))
+            self.user_agents.append(request.headers.get('User-Agent'))
+            return web.Response(text="<html><head><title>Test</title></head><body>Hallo</body></html>", content_type='text/html')
+
+        async def slow(request):
+            await asyncio.sleep(1)
+            return web.Response(text="<html><body>Zu spät</body></html>", content_type='text/html')
+
+        self.server = LocalTestServer([web.get('/page/{name}', page), web.get('/langsam', slow)]).start()
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        patcher_engine = patch('app.fetch_engine', self.engine)
+        patcher_valid = patch('app.is_valid_url', return_value=True)
+        patcher_cache = patch('app.CACHE_ENABLED', False)
+        patcher_robots = patch('app.robots_cache', app.RobotsCache({**app.ROBOTS_CONFIG, 'enabled': False}))
+        for patcher in (patcher_engine, patcher_valid, patcher_cache, patcher_robots):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+
+    def test_engine_reuses_session(self):
+        """Die Engine liefert bei mehreren Aufrufen dieselbe aiohttp-Session."""
+        first = self.engine.run(self.engine.get_session())
+        second = self.engine.run(self.engine.get_session())
+        self.assertIs(first, second)
+
+    def test_fetch_reuses_connection(self):
+        """Aufeinanderfolgende Abrufe nutzen dieselbe Keep-Alive-Verbindung."""
+        self.assertIn("Hallo", app.fetch_webpage_content(self.server.url('/page/a')))
+        self.assertIn("Hallo", app.fetch_webpage_content(self.server.url('/page/b')))
+        self.assertEqual(len(self.peers), 2)
+        self.assertEqual(self.peers[0], self.peers[1])
+
+    def test_request_timeout_comes_from_engine_config(self):
+        """Das Zeitlimit pro Abruf ist fetch_engine.request_timeout (Session-Standard), nicht fest 30 Sekunden."""
+        engine = app.FetchEngine({**app.FETCH_ENGINE_CONFIG, 'request_timeout': 0.2})
+        self.addCleanup(engine.shutdown)
+        with patch('app.fetch_engine', engine), patch('app.retry_policy', app.RetryPolicy(1, 0, app.RETRY_POLICY_CONFIG)):
+            start = time.monotonic()
+            self.assertIsNone(engine.run(app.async_fetch_page(self.server.url('/langsam'))))
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_fetch_sends_robots_user_agent(self):
+        """Die Session sendet denselben User-Agent, für den robots.txt ausgewertet wird."""
+        self.assertIn("Hallo", app.fetch_webpage_content(self.server.url('/page/a')))
+        self.assertEqual(self.user_agents, [app.robots_cache.user_agent])
+
+    def test_fetch_from_multiple_threads(self):
+        """Abrufe aus mehreren Threads werden über den gemeinsamen Event-Loop ausgeführt."""
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(app.fetch_webpage_content(self.server.url(f'/page/t{i}')))) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result and "Hallo" in result for result in results))
+
+
+class TestBoundedDownloads(unittest.TestCase):
+
+    def setUp(self):
+        async def image(request):
+            return web.Response(body=b'\x89PNG' + b'0' * 1000, content_type='image/png')
+
+        async def large(request):
+            response = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8'})
+            await response.prepare(request)
+            for _ in range(100):
+                await response.write(b'<p>' + b'a' * 10000 + b'</p>')
+            return response
+
+        self.server = LocalTestServer([web.get('/bild', image), web.get('/gross', large)]).start()
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        patchers = [
+            patch('app.fetch_engine', self.engine),
+            patch('app.is_valid_url', return_value=True),
+            patch('app.CACHE_ENABLED', False),
+            patch('app.robots_cache', app.RobotsCache({**app.ROBOTS_CONFIG, 'enabled': False})),
+            patch.dict('app.DOWNLOAD_CONFIG', {'max_body_bytes': 25000, 'chunk_size': 4096}),
+            patch.dict('app.download_stats', {'rejected_content_type': 0, 'rejected_oversize': 0, 'truncated': 0}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+
+    def test_content_type_rejected_before_body(self):
+        """Bilder werden anhand des Content-Type abgelehnt, ohne den Body zu lesen."""
+        with patch('app.read_limited_body') as mock_read_body:
+            self.assertIsNone(app.fetch_page(self.server.url('/bild')))
+            mock_read_body.assert_not_called()
+        self.assertEqual(app.download_stats['rejected_content_type'], 1)
+        self.assertTrue(app.is_unsupported_format('https://www.example.com/archiv.zip?x=1', {}))
+        self.assertFalse(app.is_unsupported_format('https://www.example.com/seite', {'Content-Type': 'text/html; charset=utf-8'}))
+
+    def test_large_body_is_truncated(self):
+        """Bodies über der Obergrenze werden abgeschnitten und nicht gecacht."""
+        with patch('app.set_cached_content') as mock_set_cache:
+            result = app.fetch_page(self.server.url('/gross'))
+            mock_set_cache.assert_not_called()
+        self.assertTrue(result['truncated'])
+        self.assertEqual(len(result['content']), 25000)
+        self.assertEqual(app.download_stats['truncated'], 1)
+
+    def test_large_body_is_rejected(self):
+        """Mit oversize_action 'reject' liefert der Abruf kein Ergebnis."""
+        with patch.dict('app.DOWNLOAD_CONFIG', {'oversize_action': 'reject'}):
+            self.assertIsNone(app.fetch_page(self.server.url('/gross')))
+        self.assertEqual(app.download_stats['rejected_oversize'], 1)
+
+
+class TestEncodingDetection(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = app.EncodingDetector({'meta_scan_bytes': 4096, 'detector_prefix_bytes': 1000})
+
+    def test_cascade_stages(self):
+        """HTTP-charset, BOM und <meta charset> werden vor dem statistischen Detektor ausgewertet."""
+        body = 'Straße'.encode('latin-1')
+        self.assertEqual(self.detector.detect(body, 'text/html; charset=ISO-8859-1'), ('iso8859-1', 'http_header'))
+        self.assertEqual(self.detector.detect(b'\xef\xbb\xbf<p>x</p>', 'text/html'), ('utf-8-sig', 'bom'))
+        self.assertEqual(self.detector.detect(b'<meta charset="windows-1252"><p>x</p>'), ('cp1252', 'meta'))
+        self.assertEqual(self.detector.detect(b'<meta http-equiv="Content-Type" content="text/html; charset=utf-16">'), ('utf-8', 'meta'))
+        self.assertEqual(self.detector.detect(b'<?xml version="1.0" encoding="ISO-8859-15"?><html/>'), ('iso8859-15', 'meta'))
+
+    def test_detector_uses_prefix_and_host_cache(self):
+        """chardet sieht nur das Präfix und wird pro Host nur einmal benötigt."""
+        body = ('<p>' + 'Grüße aus Köln ' * 500 + '</p>').encode('utf-8')
+        with patch('app.chardet.detect', return_value={'encoding': 'utf-8'}) as mock_detect:
+            self.assertEqual(self.detector.detect(body, 'text/html', 'www.example.com'), ('utf-8', 'detector'))
+            self.assertEqual(self.detector.detect(body, 'text/html', 'www.example.com'), ('utf-8', 'host_cache'))
+            self.assertEqual(mock_detect.call_count, 1)
+            self.assertEqual(len(mock_detect.call_args[0][0]), 1000)
+        self.assertEqual(self.detector.stats()['detector'], 1)
+        self.assertEqual(self.detector.stats()['host_cache'], 1)
+        self.assertEqual(self.detector.detect(b'', 'text/html'), ('utf-8', 'fallback'))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.hits = {}
+
+        async def flaky(request):
+            name = request.match_info['name']
+            self.hits[name] = self.hits.get(name, 0) + 1
+            if name == 'fehlend':
+                return web.Response(status=404)
+            if name == 'drossel' and self.hits[name] == 1:
+                return web.Response(status=429, headers={'Retry-After': '1'})
+            if name == 'instabil' and self.hits[name] < 3:
+                return web.Response(status=503)
+            return web.Response(text=f"<html><body>{name}</body></html>", content_type='text/html')
+
+        self.server = LocalTestServer([web.get('/seite/{name}', flaky)]).start()
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        self.policy = app.RetryPolicy(3, 0.01, app.RETRY_POLICY_CONFIG)
+        patchers = [
+            patch('app.fetch_engine', self.engine),
+            patch('app.is_valid_url', return_value=True),
+            patch('app.CACHE_ENABLED', False),
+            patch('app.robots_cache', app.RobotsCache({**app.ROBOTS_CONFIG, 'enabled': False})),
+            patch('app.retry_policy', self.policy),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+
+    def test_rules_by_status(self):
+        """404 und DNS-Fehler sind endgültig, 429/503 und Timeouts werden wiederholt."""
+        def response_error(status):
+            return app.aiohttp.ClientResponseError(None, (), status=status)
+        self.assertIsNone(self.policy.next_delay(response_error(404), 0))
+        self.assertIsNotNone(self.policy.next_delay(response_error(503), 0))
+        self.assertIsNotNone(self.policy.next_delay(asyncio.TimeoutError(), 0))
+        self.assertIsNone(self.policy.next_delay(response_error(503), 2))
+        self.assertEqual(self.policy.parse_retry_after('7'), 7.0)
+        self.assertLessEqual(self.policy.backoff_delay(10), 60 * 1.5)
+
+    def test_transient_errors_are_retried_and_permanent_are_not(self):
+        """503 wird bis zum Erfolg wiederholt, 404 genau einmal abgerufen."""
+        self.assertIn('instabil', app.fetch_webpage_content(self.server.url('/seite/instabil')))
+        self.assertEqual(self.hits['instabil'], 3)
+        self.assertIsNone(app.fetch_webpage_content(self.server.url('/seite/fehlend')))
+        self.assertEqual(self.hits['fehlend'], 1)
+
+    def test_retry_after_does_not_block_other_fetches(self):
+        """Während ein Abruf Retry-After abwartet, laufen andere Abrufe auf dem Event-Loop weiter."""
+        throttled = self.engine.submit(app.async_fetch_webpage_content(self.server.url('/seite/drossel')))
+        time.sleep(0.2)
+        start = time.monotonic()
+        self.assertIn('schnell', app.fetch_webpage_content(self.server.url('/seite/schnell')))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertFalse(throttled.done())
+        self.assertIn('drossel', throttled.result(timeout=5))
+        self.assertEqual(self.hits['drossel'], 2)
+
+
+class TestSeleniumPool(unittest.TestCase):
+
+    def setUp(self):
+        self.drivers = []
+
+        def create_driver(*args, **kwargs):
+            driver = MagicMock()
+            driver.page_source = f"<html><body>Browser {len(self.drivers)}</body></html>"
+            self.drivers.append(driver)
+            return driver
+
+        patcher_chrome = patch('app.webdriver.Chrome', side_effect=create_driver)
+        patcher_manager = patch('app.ChromeDriverManager')
+        patcher_service = patch('app.Service')
+        self.mock_manager = patcher_manager.start()
+        self.mock_manager.return_value.install.return_value = '/usr/bin/chromedriver'
+        for patcher in (patcher_chrome, patcher_service):
+            patcher.start()
+        for patcher in (patcher_chrome, patcher_manager, patcher_service):
+            self.addCleanup(patcher.stop)
+        self.pool = app.SeleniumPool({**app.SELENIUM_POOL_CONFIG, 'size': 1, 'max_pages_per_driver': 2, 'acquire_timeout': 0.5}, app.config['selenium_config'])
+        self.addCleanup(self.pool.shutdown)
+
+    def test_drivers_are_reused_and_recycled(self):
+        """Ein Browser wird wiederverwendet und nach max_pages_per_driver Seiten ersetzt; der Treiberpfad wird einmal ermittelt."""
+        self.assertEqual(self.mock_manager.return_value.install.call_count, 1) # Bereits beim Erzeugen des Pools
+        for _ in range(3):
+            self.pool.render('https://www.example.com/')
+        self.assertEqual(len(self.drivers), 2)
+        self.drivers[0].quit.assert_called_once()
+        self.assertEqual(self.mock_manager.return_value.install.call_count, 1)
+        stats = self.pool.stats()
+        self.assertEqual((stats['created'], stats['recycled'], stats['idle'], stats['busy']), (2, 1, 1, 0))
+
+    def test_crashed_driver_is_replaced(self):
+        """Nach einem WebDriver-Fehler wird der Browser verworfen."""
+        with self.assertRaises(app.WebDriverException):
+            with self.pool.driver():
+                raise app.WebDriverException("Browser abgestürzt")
+        self.drivers[0].quit.assert_called_once()
+        self.assertIn('Browser 1', self.pool.render('https://www.example.com/'))
+        self.assertEqual(self.pool.stats()['crashed'], 1)
+
+    def test_pool_is_bounded(self):
+        """Mehr gleichzeitige Anfragen als Browser warten und laufen nach acquire_timeout ab."""
+        with self.pool.driver():
+            with self.assertRaises(TimeoutError):
+                with self.pool.driver():
+                    pass
+        def hold_driver():
+            with self.pool.driver():
+                time.sleep(0.2)
+
+        holder = threading.Thread(target=hold_driver)
+        holder.start()
+        time.sleep(0.05)
+        self.pool.render('https://www.example.com/')
+        holder.join()
+        stats = self.pool.stats()
+        self.assertEqual((stats['timeouts'], stats['total']), (1, 1))
+        self.assertGreaterEqual(stats['max_wait_seconds'], 0.1)
+
+    def test_warm_is_not_counted_as_acquisition(self):
+        """Vorgestartete Browser liegen bereit, ohne die Anforderungs- und Wartezeit-Kennzahlen zu verändern."""
+        self.pool.warm(3)
+        stats = self.pool.stats()
+        self.assertEqual((stats['created'], stats['idle'], stats['total'], stats['acquisitions']), (1, 1, 1, 0))
+        self.pool.render('https://www.example.com/')
+        self.assertEqual((len(self.drivers), self.pool.stats()['acquisitions']), (1, 1))
+
+
+class TestFetchBatch(unittest.TestCase):
+
+    def setUp(self):
+        async def page(request):
+            name = request.match_info['name']
+            return web.Response(text=f"<html><head><title>Seite {name}</title></head><body><h1>{name}</h1><p>Inhalt der Seite {name}</p></body></html>", content_type='text/html')
+
+        async def missing(request):
+            return web.Response(status=404)
+
+        self.server = LocalTestServer([web.get('/page/{name}', page), web.get('/missing', missing)]).start()
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'test.db')
+        patchers = [
+            patch('app.fetch_engine', self.engine),
+            patch('app.is_valid_url', side_effect=lambda url: url.startswith('http://127.0.0.1')),
+            patch('app.CACHE_ENABLED', False),
+            patch('app.retry_policy', app.RetryPolicy(app.MAX_RETRIES, 0, app.RETRY_POLICY_CONFIG)),
+            patch('app.RATE_LIMIT_ENABLED', False),
+            patch('app.API_KEYS', {'test-key'}),
+            patch('app.DATABASE_FILE', self.db_file),
+            patch('app.robots_cache', app.RobotsCache(app.ROBOTS_CONFIG)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(app.db_connections.close_all) # Gepoolte Verbindungen auf die temporäre Datenbank schließen
+        app.init_db()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def test_fetch_batch_returns_results_per_url(self):
+        """Der Batch-Endpunkt liefert Ergebnisse pro URL und speichert erfolgreiche Seiten."""
+        urls = [self.server.url('/page/a'), self.server.url('/page/b'), self.server.url('/missing'), "keine-url"]
+        response = self.client.post('/api/v1/fetch-batch', data=json.dumps({"urls": urls, "text_only": True}),
+                                    headers={'X-API-Key': 'test-key'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()['data']
+        statuses = {result['url']: result['status'] for result in data['results']}
+        self.assertEqual(statuses[urls[0]], 'success')
+        self.assertEqual(statuses[urls[1]], 'success')
+        self.assertEqual(statuses[urls[2]], 'error')
+        self.assertEqual(statuses["keine-url"], 'error')
+        self.assertEqual(data['succeeded'], 2)
+        self.assertEqual(data['database_status'], 'success')
+
+        conn = sqlite3.connect(self.db_file)
+        titles = sorted(row[0] for row in conn.execute("SELECT title FROM web_content"))
+        conn.close()
+        self.assertEqual(titles, ["Seite a", "Seite b"])
+
+    def test_fetch_batch_rejects_empty_list(self):
+        """Ein leerer Batch wird mit einem Validierungsfehler abgelehnt."""
+        response = self.client.post('/api/v1/fetch-batch', data=json.dumps({"urls": []}),
+                                    headers={'X-API-Key': 'test-key'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCrawl(unittest.TestCase):
+
+    SITE = {
+        '/robots.txt': 'User-agent: *\nDisallow: /b\nAllow: /b$\n\nUser-agent: WebCrawler-Pro\nDisallow: /e\nCrawl-delay: 0.01',
+        '/': '<a href="/a">A</a> <a href="/b#anker">B</a> <a href="/privat/x">X</a> <a href="https://extern.example.com/">Extern</a>',
+        '/a': '<a href="/c">C</a> <a href="/">Start</a>',
+        '/b': '<a href="/d">D</a>',
+        '/c': '<a href="/e">E</a>',
+        '/d': 'Ende',
+        '/e': 'Ende',
+        '/privat/x': 'Geheim',
+    }
+
+    def setUp(self):
+        self.requested = []
+
+        async def page(request):
+            self.requested.append(request.path)
+            body = self.SITE.get(request.path)
+            if body is None:
+                return web.Response(status=404)
+            return web.Response(text=f"<html><head><title>{request.path}</title></head><body>{body}</body></html>", content_type='text/html')
+
+        async def robots(request):
+            return web.Response(text=self.SITE['/robots.txt'])
+
+        self.server = LocalTestServer([web.get('/robots.txt', robots), web.get('/{tail:.*}', page)]).start()
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'test.db')
+        patchers = [
+            patch('app.fetch_engine', self.engine),
+            patch('app.is_valid_url', side_effect=lambda url: url.startswith('http://127.0.0.1')),
+            patch('app.CACHE_ENABLED', False),
+            patch('app.DATABASE_FILE', self.db_file),
+            patch('app.robots_cache', app.RobotsCache(app.ROBOTS_CONFIG)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(app.db_connections.close_all) # Gepoolte Verbindungen auf die temporäre Datenbank schließen
+        app.init_db()
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def stored_urls(self):
+        conn = sqlite3.connect(self.db_file)
+        urls = {row[0].split(str(self.server.port))[1] for row in conn.execute("SELECT url FROM web_content")}
+        conn.close()
+        return urls
+
+    def test_crawl_respects_depth_and_patterns(self):
+        """Der Crawl folgt Links bis zur maximalen Tiefe und beachtet Ausschlussmuster."""
+        crawl_options = app.CrawlOptions(max_depth=1, max_pages=50, exclude_patterns=['/privat/'], concurrency=3)
+        summary = app.crawl_site(self.server.url('/'), crawl_options)
+        self.assertEqual(summary['pages_stored'], 3)
+        self.assertEqual(self.stored_urls(), {'/', '/a', '/b'})
+        self.assertNotIn('/privat/x', self.requested)
+
+    def test_crawl_respects_max_pages(self):
+        """Der Crawl ruft nie mehr als 'max_pages' Seiten ab."""
+        crawl_options = app.CrawlOptions(max_depth=5, max_pages=4, concurrency=2)
+        summary = app.crawl_site(self.server.url('/'), crawl_options)
+        self.assertEqual(summary['pages_stored'] + summary['pages_failed'], 4)
+        self.assertEqual(len(self.requested), 4)
+
+    def test_crawl_skips_robots_disallowed_links(self):
+        """Durch robots.txt gesperrte Links werden vor dem Abruf aus der Frontier gefiltert."""
+        crawl_options = app.CrawlOptions(max_depth=5, max_pages=50, exclude_patterns=['/privat/'], concurrency=2)
+        summary = app.crawl_site(self.server.url('/'), crawl_options)
+        self.assertEqual(summary['pages_failed'], 0)
+        self.assertEqual(self.stored_urls(), {'/', '/a', '/b', '/c', '/d'})
+        self.assertNotIn('/e', self.requested)
+
+    def test_scheduled_crawl_task_runner(self):
+        """Geplante Tasks vom Typ 'crawl' werden an den Crawl-Runner übergeben."""
+        task_function, task_kwargs = app.get_task_runner({'id': 't1', 'url': self.server.url('/'), 'task_type': 'crawl', 'crawl_options': '{"max_depth": 0}'})
+        self.assertIs(task_function, app.run_crawl_task)
+        task_function, task_kwargs = app.get_task_runner({'id': 't2', 'url': self.server.url('/'), 'task_type': 'page'})
+        self.assertIs(task_function, app.scrape_and_store_url)
+
+    def test_update_payload_validates_crawl_options(self):
+        """Auch beim Aktualisieren eines Tasks werden die Crawl-Optionen wie beim Anlegen geprüft."""
+        self.assertEqual(app.ScheduledTaskUpdatePayload(crawl_options='{"max_depth": 1}').crawl_options, '{"max_depth": 1}')
+        for crawl_options in ('kein json', '{"max_pages": 0}', '{"include_patterns": ["("]}'):
+            with self.assertRaises(app.ValidationError):
+                app.ScheduledTaskUpdatePayload(crawl_options=crawl_options)
+
+    def test_crawl_job_registry_evicts_finished_jobs(self):
+        """Die Statusliste bleibt begrenzt; verdrängt werden nur abgeschlossene Crawls."""
+        crawl_jobs = app.CrawlJobRegistry(max_jobs=2)
+        crawl_jobs.create('laufend')
+        crawl_jobs.create('fertig')
+        crawl_jobs.update('fertig', status='finished')
+        crawl_jobs.create('neu')
+        self.assertIsNone(crawl_jobs.get('fertig'))
+        self.assertEqual(crawl_jobs.get('laufend')['status'], 'running')
+        self.assertEqual(crawl_jobs.get('neu')['crawl_id'], 'neu')
+
+
+class TestHostPoliteness(unittest.TestCase):
+
+    def make_scheduler(self, **overrides):
+        politeness_config = {'enabled': True, 'requests_per_second': 0, 'burst': 1, 'max_concurrent_per_host': 10, 'min_delay': 0.0, 'domains': {}}
+        politeness_config.update(overrides)
+        return app.HostPolitenessScheduler(politeness_config)
+
+    def run_requests(self, scheduler, hosts, duration=0.0):
+        active_peaks = {}
+
+        async def fake_request(host):
+            async with scheduler.slot(host):
+                active = scheduler.stats()[host]['active']
+                active_peaks[host] = max(active_peaks.get(host, 0), active)
+                await asyncio.sleep(duration)
+
+        async def run_all():
+            await asyncio.gather(*(fake_request(host) for host in hosts))
+
+        asyncio.run(run_all())
+        return active_peaks
+
+    def test_token_bucket_limits_rate(self):
+        """Der Token-Bucket begrenzt die Anzahl Requests pro Sekunde und Host."""
+        scheduler = self.make_scheduler(requests_per_second=20, burst=1)
+        start = time.monotonic()
+        self.run_requests(scheduler, ['a.example.com'] * 5)
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+        self.assertEqual(scheduler.stats()['a.example.com']['requests'], 5)
+
+    def test_max_concurrent_per_host(self):
+        """Pro Host laufen nie mehr Requests gleichzeitig als erlaubt; andere Hosts bleiben unabhängig."""
+        scheduler = self.make_scheduler(max_concurrent_per_host=2)
+        peaks = self.run_requests(scheduler, ['a.example.com'] * 6 + ['b.example.com'] * 3, duration=0.02)
+        self.assertEqual(peaks['a.example.com'], 2)
+        self.assertEqual(peaks['b.example.com'], 2)
+        self.assertEqual(scheduler.stats()['a.example.com']['queued'], 0)
+
+    def test_slots_work_across_event_loops(self):
+        """Derselbe Host kann nacheinander und gleichzeitig aus verschiedenen Event-Loops genutzt werden."""
+        scheduler = self.make_scheduler(max_concurrent_per_host=1)
+        self.assertEqual(self.run_requests(scheduler, ['a.example.com'] * 3, duration=0.01)['a.example.com'], 1)
+        threads = [threading.Thread(target=self.run_requests, args=(scheduler, ['a.example.com'] * 3, 0.01)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = scheduler.stats()['a.example.com']
+        self.assertEqual((stats['requests'], stats['active'], stats['queued']), (9, 0, 0))
+
+    def test_domain_override(self):
+        """Domain-spezifische Werte aus der Konfiguration gelten auch für Subdomains."""
+        scheduler = self.make_scheduler(domains={'example.com': {'min_delay': 1.5}, 'slow.example.com': {'max_concurrent_per_host': 1}})
+        self.assertEqual(scheduler.settings_for('www.example.com')['min_delay'], 1.5)
+        self.assertEqual(scheduler.settings_for('slow.example.com:8080')['max_concurrent_per_host'], 1)
+        self.assertEqual(scheduler.settings_for('slow.example.com')['min_delay'], 1.5)
+        self.assertEqual(scheduler.settings_for('other.org')['min_delay'], 0.0)
+
+
+class TestRobotsRules(unittest.TestCase):
+
+    ROBOTS_TXT = """
+# Kommentar
+User-agent: *
+Disallow: /privat/
+Allow: /privat/oeffentlich
+Disallow: /*.pdf$
+Crawl-delay: 2
+
+User-agent: WebCrawler-Pro
+User-agent: AndererBot
+Disallow: /nur-fuer-uns/
+Crawl-delay: 5
+"""
+
+    def test_parse_selects_specific_group(self):
+        """Die Gruppe des eigenen User-Agents hat Vorrang vor der '*'-Gruppe."""
+        rules, crawl_delay = app.parse_robots_txt(self.ROBOTS_TXT, 'WebCrawler-Pro')
+        self.assertEqual(rules, [[False, '/nur-fuer-uns/']])
+        self.assertEqual(crawl_delay, 5)
+        rules, crawl_delay = app.parse_robots_txt(self.ROBOTS_TXT, 'IrgendeinBot')
+        self.assertEqual(len(rules), 3)
+        self.assertEqual(crawl_delay, 2)
+
+    def test_longest_match_and_wildcards(self):
+        """Die längste passende Regel gewinnt; '*' und '$' werden unterstützt."""
+        rules = app.RobotsRules(*app.parse_robots_txt(self.ROBOTS_TXT, 'IrgendeinBot'))
+        self.assertFalse(rules.is_allowed_path('/privat/daten'))
+        self.assertTrue(rules.is_allowed_path('/privat/oeffentlich/seite'))
+        self.assertFalse(rules.is_allowed_path('/dokumente/gesetz.pdf'))
+        self.assertTrue(rules.is_allowed_path('/dokumente/gesetz.pdf?version=2'))
+        self.assertTrue(rules.is_allowed_path('/'))
+
+    def test_cached_rules_answer_without_network(self):
+        """Nach dem Laden beantwortet der Cache Anfragen synchron aus dem Speicher."""
+        robots_cache = app.RobotsCache(app.ROBOTS_CONFIG)
+        robots_cache._rules['https://www.example.com'] = (app.RobotsRules([[False, '/intern']]), time.time() + 60)
+        self.assertFalse(robots_cache.is_allowed('https://www.example.com/intern/seite'))
+        self.assertTrue(robots_cache.is_allowed('https://www.example.com/extern'))
+        self.assertTrue(robots_cache.is_allowed('https://unbekannt.example.org/intern'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -75,6 +75,17 @@ class TestWebScrapingFunctions(unittest.TestCase):
         # Robusterer Test: Mindestens eines der erwarteten Keywords muss enthalten sein
         self.assertTrue(any(word in keywords for word in ['keywords', 'wichtig', 'testtext']))
 
+    def test_keyword_engine_tokenizer_and_batch(self):
+        """Testet Satzzeichen-Behandlung, Stopwort-Cache und Batch-Extraktion der KeywordEngine."""
+        engine = app.KeywordEngine()
+        text = "Vertrag, Vertrag. (Vertrag) Angebot-Annahme: Angebot! Gesetz 2024"
+        self.assertEqual(engine.extract(text, top_n=2), ['vertrag', 'angebot'])
+        self.assertEqual(engine.extract(text, top_n=10, custom_stopwords="vertrag, gesetz"), ['angebot', 'annahme'])
+        self.assertIs(engine.stopwords_for("vertrag, gesetz"), engine.stopwords_for("vertrag, gesetz"))
+
+        texts = [text, "", "Kündigung Kündigung Frist"]
+        self.assertEqual(engine.extract_many(texts, top_n=1), [['vertrag'], [], ['kündigung']])
+
     @patch('app.fetch_webpage_content', return_value=TEST_HTML)
     def test_extract_data_css(self, mock_fetch):
         """Testet die Extraktion von Daten mit CSS-Selektoren."""
@@ -83,6 +94,35 @@ class TestWebScrapingFunctions(unittest.TestCase):
         self.assertEqual(extracted_data.get("title"), ["Example Domain"])
         self.assertEqual(extracted_data.get("h1"), ["Example Domain"])
 
+    def test_parsed_document_single_parse(self):
+        """Alle Extraktionen einer Seite nutzen einen einzigen Parse und liefern dieselben Ergebnisse wie die Einzelfunktionen."""
+        html = TEST_HTML.replace('<body>', '<body><nav><a href="/start">Start</a></nav><script>var x = 1;</script>')
+        with patch('app.BeautifulSoup', wraps=BeautifulSoup) as mock_soup:
+            document = app.ParsedDocument(html)
+            results = (document.text(), document.title(), document.meta_description(), document.h1_headings(),
+                       document.css_data('{"h1": "h1"}'), document.links(TEST_URL))
+            self.assertEqual(mock_soup.call_count, 1)
+        self.assertEqual(results[0], TEST_TEXT)
+        self.assertEqual(results[1:5], ("Example Domain", "Test Description", ['Example Domain'], {"h1": ["Example Domain"]}))
+        self.assertEqual(results[5], [TEST_URL + "/start", "https://www.iana.org/domains/example"])
+
+    def test_parser_backends_are_equivalent(self):
+        """lxml und selectolax liefern dieselben Ergebnisse wie html.parser; fehlende Bibliotheken fallen auf html.parser zurück."""
+        html = TEST_HTML.replace('<body>', '<body><nav><a href="/start">Start</a></nav><div class="preis"> 3 &amp; <b>4</b></div>')
+        css_selectors = '{"preis": ".preis", "erster": "p:nth-of-type(1)"}'
+        expected = app.parse_document(html, 'html.parser')
+        for backend, installed in (('lxml', app.lxml), ('selectolax', app.LexborHTMLParser)):
+            with self.subTest(backend=backend):
+                if not installed:
+                    self.assertEqual(app.resolve_html_parser(backend), 'html.parser')
+                    continue
+                document = app.parse_document(html, backend)
+                self.assertEqual(document.text(), expected.text())
+                self.assertEqual((document.title(), document.meta_description(), document.h1_headings()), ("Example Domain", "Test Description", ['Example Domain']))
+                self.assertEqual(document.links(TEST_URL), expected.links(TEST_URL))
+                self.assertEqual(document.css_data(css_selectors), {"preis": ["3 &4"], "erster": ["This domain is for use in illustrative examples in documents."]})
+        self.assertEqual(app.resolve_html_parser('unbekannt'), 'html.parser')
+
 
 
     def test_is_safe_css_selector(self):
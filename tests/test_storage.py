@@ -0,0 +1,782 @@
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from aiohttp import web
+import app  # Import des Hauptprogramms
+from tests.test_fetching import LocalTestServer
+
+TEST_HTML = """<html><head><title>Gesetz</title><meta name='description' content='Beschreibung'></head>
+<body><h1>Paragraph 1</h1><p>Der Vertrag kommt durch Angebot und Annahme zustande.</p></body></html>"""
+
+
+class StorageTestCase(unittest.TestCase):
+    """Basisklasse: temporäre Datenbank, lokaler Testserver und eigene Fetch-Engine pro Test."""
+
+    def setUp(self):
+        self.requests_seen = []
+        self.page_html = TEST_HTML
+        self.etag = '"v1"'
+
+        async def page(request):
+            self.requests_seen.append(dict(request.headers))
+            if self.etag is None:
+                return web.Response(text=self.page_html, content_type='text/html')
+            if request.headers.get('If-None-Match') == self.etag:
+                return web.Response(status=304, headers={'ETag': self.etag})
+            return web.Response(text=self.page_html, content_type='text/html',
+                                headers={'ETag': self.etag, 'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'})
+
+        self.server = LocalTestServer([web.get('/gesetz', page)]).start()
+        self.url = self.server.url('/gesetz')
+        self.engine = app.FetchEngine(app.FETCH_ENGINE_CONFIG)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'test.db')
+        patchers = [
+            patch('app.fetch_engine', self.engine),
+            patch('app.is_valid_url', side_effect=lambda url: url.startswith('http://127.0.0.1')),
+            patch('app.CACHE_ENABLED', False),
+            patch('app.RATE_LIMIT_ENABLED', False),
+            patch('app.DATABASE_FILE', self.db_file),
+            patch('app.robots_cache', app.RobotsCache({**app.ROBOTS_CONFIG, 'enabled': False})),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(app.db_connections.close_all) # Gepoolte Verbindungen auf die temporäre Datenbank schließen
+        app.init_db()
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def query(self, sql, params=()):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def create_task(self, task_id='task-1'):
+        app.save_scheduled_task_to_db({'id': task_id, 'url': self.url, 'schedule_time': 'stündlich', 'text_only': True})
+        return task_id
+
+
+class TestConditionalRevalidation(StorageTestCase):
+
+    def test_second_run_sends_validators_and_skips_processing(self):
+        """Der zweite Lauf sendet If-None-Match; bei 304 wird weder geparst noch geschrieben."""
+        task_id = self.create_task()
+        app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+        first_row = self.query("SELECT id, etag, last_modified, content_hash, timestamp FROM web_content WHERE url = ?", (self.url,))
+        self.assertEqual(first_row[0][1], '"v1"')
+        self.assertEqual(first_row[0][2], 'Wed, 01 Jan 2025 00:00:00 GMT')
+        self.assertIsNotNone(first_row[0][3])
+
+        with patch('app.extract_title') as mock_extract_title, patch('app.save_to_db') as mock_save_to_db:
+            app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+            mock_extract_title.assert_not_called()
+            mock_save_to_db.assert_not_called()
+
+        self.assertEqual(self.requests_seen[-1].get('If-None-Match'), '"v1"')
+        self.assertEqual(self.requests_seen[-1].get('If-Modified-Since'), 'Wed, 01 Jan 2025 00:00:00 GMT')
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = ?", (task_id,))[0][0], 'success - not modified')
+
+    def test_changed_page_is_stored_again(self):
+        """Liefert der Server einen neuen ETag, wird die Seite vollständig verarbeitet."""
+        task_id = self.create_task()
+        app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+        self.etag = '"v2"'
+        self.page_html = TEST_HTML.replace('Gesetz', 'Neues Gesetz')
+        app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+        self.assertEqual(self.query("SELECT title, etag FROM web_content WHERE url = ?", (self.url,)), [('Neues Gesetz', '"v2"')])
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = ?", (task_id,))[0][0], 'success')
+
+
+class TestContentHashUpsert(StorageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.etag = None  # Server ohne Validatoren: nur der Content-Hash erkennt unveränderte Seiten.
+
+    def test_unchanged_body_skips_pipeline(self):
+        """Bei identischem Content-Hash werden Extraktion und Schreibvorgang übersprungen."""
+        task_id = self.create_task()
+        app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+        with patch('app.extract_title') as mock_extract_title, patch('app.save_to_db') as mock_save_to_db:
+            app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+            mock_extract_title.assert_not_called()
+            mock_save_to_db.assert_not_called()
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = ?", (task_id,))[0][0], 'success - unchanged')
+
+    def test_changed_options_reprocess_unchanged_body(self):
+        """Gleicher Inhalt, aber geänderte Extraktionsoptionen: Keywords werden neu berechnet und gespeichert."""
+        task_id = self.create_task()
+        app.scrape_and_store_url(self.url, extract_text_only=True, task_id=task_id)
+        self.assertIn('vertrag', self.query("SELECT keywords FROM web_content WHERE url = ?", (self.url,))[0][0])
+        app.scrape_and_store_url(self.url, extract_text_only=True, custom_stopwords_cli='vertrag', task_id=task_id)
+        self.assertNotIn('vertrag', self.query("SELECT keywords FROM web_content WHERE url = ?", (self.url,))[0][0])
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = ?", (task_id,))[0][0], 'success')
+        app.scrape_and_store_url(self.url, extract_text_only=True, custom_stopwords_cli='vertrag', task_id=task_id)
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = ?", (task_id,))[0][0], 'success - unchanged')
+
+    def test_upsert_keeps_row_id(self):
+        """Geänderte Inhalte werden per UPSERT in derselben Zeile aktualisiert."""
+        app.save_to_db(self.url, 'example.com', 'Alt', None, None, None, '<p>alt</p>', 'alt', None)
+        first_id = self.query("SELECT id FROM web_content WHERE url = ?", (self.url,))[0][0]
+        app.save_to_db('https://www.example.com/andere', 'example.com', 'Andere', None, None, None, '<p>x</p>', 'x', None)
+        app.save_to_db(self.url, 'example.com', 'Neu', None, None, None, '<p>neu</p>', 'neu', None)
+        self.assertEqual(self.query("SELECT id, title FROM web_content WHERE url = ?", (self.url,)), [(first_id, 'Neu')])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM web_content")[0][0], 2)
+
+    def test_identical_write_is_noop(self):
+        """Ein Schreibvorgang mit identischem Inhalt verändert die Zeile nicht."""
+        app.save_to_db(self.url, 'example.com', 'Titel', None, None, None, '<p>x</p>', 'x', None)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("UPDATE web_content SET timestamp = '2000-01-01 00:00:00'")
+        conn.commit()
+        conn.close()
+        app.save_to_db(self.url, 'example.com', 'Titel', None, None, None, '<p>x</p>', 'x', None)
+        self.assertEqual(self.query("SELECT timestamp FROM web_content WHERE url = ?", (self.url,))[0][0], '2000-01-01 00:00:00')
+
+
+
+class TestCompressedBodies(StorageTestCase):
+
+    def test_identical_bodies_are_stored_once(self):
+        """Gleiche Inhalte unter verschiedenen URLs belegen nur einen Blob; inline bleibt nichts stehen."""
+        html = '<p>' + 'Angebot und Annahme ' * 200 + '</p>'
+        app.save_to_db('https://www.example.com/a', 'example.com', 'A', None, None, None, html, 'Angebot', None)
+        app.save_to_db('https://www.example.com/b', 'example.com', 'B', None, None, None, html, 'Angebot', None)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM content_blobs")[0][0], 2)
+        self.assertNotIn('html_content', [row[1] for row in self.query("PRAGMA table_info(web_content)")])
+        size, stored = self.query("SELECT size, LENGTH(data) FROM content_blobs WHERE hash = ?", (app.compute_content_hash(html),))[0]
+        self.assertLess(stored, size)
+
+    def test_codecs_round_trip(self):
+        """Alle Codecs liefern den Originaltext zurück."""
+        text = 'Straße ' * 50
+        for codec in ['zlib', 'none'] + (['zstd'] if app.zstandard else []):
+            with patch('app.BODY_COMPRESSION', codec):
+                stored_codec, data = app.compress_body(text)
+            self.assertEqual(stored_codec, codec)
+            self.assertEqual(app.decompress_body(stored_codec, data), text)
+
+    def test_search_reads_compressed_text(self):
+        """Die Volltextsuche findet Text auch in komprimierten Blobs."""
+        app.save_to_db(self.url, 'example.com', 'Titel', None, None, None, '<p>x</p>', 'Der Vertrag kommt zustande', None)
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content?query=Vertrag&search_field=text_content', headers={'X-API-Key': 'test-key'})
+        data = response.get_json()['data']
+        self.assertEqual([row['text_content'] for row in data], ['Der Vertrag kommt zustande'])
+
+    def test_migrate_storage_removes_orphaned_blobs(self):
+        """Nicht mehr referenzierte Blobs werden entfernt, referenzierte bleiben lesbar."""
+        app.save_to_db(self.url, 'example.com', 'Titel', None, None, None, '<p>x</p>', 'x', None)
+        conn = app.connect_db()
+        conn.execute("INSERT INTO content_blobs (hash, codec, size, data) VALUES ('verwaist', 'none', 1, x'00')")
+        conn.commit()
+        conn.close()
+        result = app.migrate_storage()
+        self.assertEqual(result['removed_blobs'], 1)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM content_blobs WHERE hash = 'verwaist'")[0][0], 0)
+        conn = app.connect_db()
+        try:
+            self.assertEqual(conn.execute(f"SELECT {app.HTML_CONTENT_SQL} FROM web_content").fetchall(), [('<p>x</p>',)])
+        finally:
+            conn.close()
+
+    def test_replaced_blobs_are_deleted_on_upsert(self):
+        """Beim Ersetzen einer Seite verschwinden ihre alten Blobs, außer eine andere Seite verwendet sie noch."""
+        with patch.dict(app.SNAPSHOT_CONFIG, {'enabled': False}):
+            app.save_to_db(self.url, 'example.com', 'Alt', None, None, None, '<p>geteilt</p>', 'alter Text', None)
+            app.save_to_db('https://www.example.com/b', 'example.com', 'B', None, None, None, '<p>geteilt</p>', 'anderer Text', None)
+            app.save_to_db(self.url, 'example.com', 'Neu', None, None, None, '<p>neu</p>', 'neuer Text', None)
+            self.assertEqual(self.query("SELECT COUNT(*) FROM content_blobs WHERE hash IN (?, ?)",
+                                        (app.compute_content_hash('<p>geteilt</p>'), app.compute_content_hash('alter Text')))[0][0], 1)
+            records = [app.build_web_content_record('https://www.example.com/b', 'example.com', 'B', None, None, None, f'<p>{version}</p>', version, None)
+                       for version in ('zwischenstand', 'endstand')]
+            self.assertTrue(app.save_many_to_db(records))
+        hashes = {row[0] for row in self.query("SELECT hash FROM content_blobs")}
+        expected = {app.compute_content_hash(content) for content in ('<p>neu</p>', 'neuer Text', '<p>endstand</p>', 'endstand')}
+        self.assertEqual(hashes, expected)
+        self.assertEqual(app.migrate_storage()['removed_blobs'], 0)
+
+
+class TestSchemaMigration(StorageTestCase):
+
+    def create_legacy_database(self):
+        # Ursprüngliches Schema: Inhalte inline in web_content, Index auf url, keine Schema-Version
+        app.db_connections.close_all()
+        os.remove(self.db_file)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("""CREATE TABLE web_content (id INTEGER PRIMARY KEY AUTOINCREMENT, domain TEXT, url TEXT UNIQUE, title TEXT, meta_description TEXT,
+                        h1_headings TEXT, keywords TEXT, html_content TEXT, text_content TEXT, processed_content TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+        conn.execute("CREATE INDEX idx_web_content_url ON web_content (url)")
+        for path in ('/a', '/b', '/geloescht'):
+            conn.execute("INSERT INTO web_content (domain, url, title, html_content, text_content) VALUES (?, ?, ?, ?, ?)",
+                         ('example.com', 'https://www.example.com' + path, 'Alt', '<p>' + 'Kaufvertrag ' * 500 + '</p>', 'Kaufvertrag'))
+        conn.execute("DELETE FROM web_content WHERE url LIKE '%/geloescht'")
+        conn.commit()
+        conn.close()
+
+    def test_init_db_upgrades_legacy_database_in_place(self):
+        """init_db lagert Inline-Inhalte aus, entfernt die Spalten, legt die neuen Indizes an und bleibt danach ein No-op."""
+        self.create_legacy_database()
+        app.init_db()
+        app.init_db()
+        self.assertEqual(self.query("SELECT version FROM schema_version ORDER BY version"), [(version,) for version, _, _ in app.SCHEMA_MIGRATIONS])
+        columns = [row[1] for row in self.query("PRAGMA table_info(web_content)")]
+        self.assertEqual(tuple(columns), app.WEB_CONTENT_COLUMNS)
+        indexes = {row[0] for row in self.query("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'web_content'")}
+        self.assertIn('idx_web_content_domain_timestamp', indexes)
+        self.assertIn('idx_web_content_timestamp', indexes)
+        self.assertNotIn('idx_web_content_url', indexes)
+        plan = self.query("EXPLAIN QUERY PLAN SELECT id, title FROM web_content WHERE domain = ? ORDER BY timestamp DESC LIMIT 10", ('example.com',))
+        self.assertIn('idx_web_content_domain_timestamp', plan[0][-1])
+        conn = app.connect_db()
+        try:
+            self.assertEqual(conn.execute(f"SELECT id, {app.TEXT_CONTENT_SQL} FROM web_content ORDER BY id").fetchall(), [(1, 'Kaufvertrag'), (2, 'Kaufvertrag')])
+        finally:
+            conn.close()
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content?query=kaufvertrag&search_field=text_content', headers={'X-API-Key': 'test-key'})
+        self.assertEqual(len(response.get_json()['data']), 2)
+        app.save_to_db('https://www.example.com/c', 'example.com', 'Neu', None, None, None, '<p>c</p>', 'c', None)
+        self.assertEqual(self.query("SELECT id FROM web_content WHERE title = 'Neu'"), [(4,)]) # id 3 (gelöscht) wird nicht wiederverwendet
+
+
+
+class SearchTestCase(StorageTestCase):
+    """Basisklasse mit Hilfsfunktionen für /api/v1/search-content."""
+
+    def search(self, **params):
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content', query_string=params, headers={'X-API-Key': 'test-key'})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json().get('data', [])
+
+    def search_page(self, **params):
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content', query_string=params, headers={'X-API-Key': 'test-key'})
+        body = response.get_json()
+        return body.get('data', []), body['pagination']['next_cursor']
+
+
+class TestFulltextSearch(SearchTestCase):
+
+    def test_ranked_phrase_and_prefix_queries(self):
+        """bm25-Ranking (Titel vor Text), Phrasen, Präfixe und hervorgehobene Ausschnitte."""
+        app.save_to_db('https://www.example.com/miete', 'example.com', 'Mietrecht', None, None, None, '<p>m</p>', 'Auch ein Kaufvertrag kann die Miete betreffen.', None)
+        app.save_to_db('https://www.example.com/kauf', 'example.com', 'Kaufvertrag', None, None, None, '<p>k</p>', 'Der Käufer zahlt den Kaufpreis.', None)
+        app.save_to_db('https://www.example.com/frist', 'example.com', 'Fristen', None, None, None, '<p>f</p>', 'Die Frist beträgt zwei Wochen.', None)
+
+        results = self.search(query='kaufvertrag', search_field='all')
+        self.assertEqual([row['url'] for row in results], ['https://www.example.com/kauf', 'https://www.example.com/miete'])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertIn('<mark>Kaufvertrag</mark>', results[1]['snippet'])
+
+        self.assertEqual([row['url'] for row in self.search(query='"zahlt den"', search_field='text_content')], ['https://www.example.com/kauf'])
+        self.assertEqual(len(self.search(query='kauf*', search_field='text_content')), 2)
+        self.assertEqual([row['title'] for row in self.search(query='kaufer', search_field='text_content')], ['Kaufvertrag']) # Umlaute normalisiert
+        self.assertEqual(len(self.search(query='example.com', search_field='domain', limit=2)), 2)
+
+    def test_invalid_fts_syntax_falls_back_to_quoted_terms(self):
+        """Offene Anführungszeichen, URLs und 'feld:wert' sind FTS5-Syntaxfehler und werden als Phrasen gesucht."""
+        app.save_to_db('https://www.example.com/kauf', 'example.com', 'Kaufvertrag', None, None, None, '<p>k</p>', 'Der vertrag von https://a.example gilt.', None)
+        for query in ('"vertrag', 'https://a.example', 'foo:bar'):
+            with self.subTest(query=query):
+                self.search(query=query, search_field='all')
+        self.assertEqual([row['title'] for row in self.search(query='"vertrag', search_field='text_content')], ['Kaufvertrag'])
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content', query_string={'query': '"vertrag', 'search_field': 'all', 'format': 'ndjson'}, headers={'X-API-Key': 'test-key'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 1)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Trigger halten den Index bei Ersetzen und Löschen synchron."""
+        url = 'https://www.example.com/a'
+        app.save_to_db(url, 'example.com', 'Alt', None, None, None, '<p>1</p>', 'Widerruf innerhalb einer Frist', None)
+        app.save_to_db(url, 'example.com', 'Neu', None, None, None, '<p>2</p>', 'Gewährleistung beim Kauf', None)
+        self.assertEqual(self.search(query='widerruf', search_field='text_content'), [])
+        self.assertEqual([row['title'] for row in self.search(query='gewährleistung', search_field='text_content')], ['Neu'])
+
+        conn = app.connect_db()
+        conn.execute("DELETE FROM web_content WHERE url = ?", (url,))
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.search(query='gewährleistung', search_field='all'), [])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM web_content_fts WHERE web_content_fts MATCH 'kauf'")[0][0], 0)
+
+
+class TestSearchPagination(SearchTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Gleich lange Texte erzeugen identische bm25-Werte; die Reihenfolge muss trotzdem stabil sein
+        app.save_many_to_db([{'url': f'https://www.example.com/{number}', 'domain': 'example.com', 'title': f'Seite {number}', 'meta_description': None,
+                              'h1_headings': None, 'keywords': None, 'html_content': f'<p>{number}</p>', 'text_content': f'Vertrag Nummer {number}',
+                              'processed_content': None} for number in range(7)])
+
+    def test_keyset_pages_cover_all_results_once(self):
+        """Cursor-Seiten liefern jede Zeile genau einmal, in beiden Suchpfaden (FTS5 und LIKE)."""
+        for search_field, query in (('text_content', 'vertrag'), ('url', 'example.com')):
+            seen, cursor = [], None
+            while True:
+                params = {'query': query, 'search_field': search_field, 'limit': 3, 'fields': 'url'}
+                if cursor:
+                    params['cursor'] = cursor
+                page, cursor = self.search_page(**params)
+                self.assertLessEqual(len(page), 3)
+                seen.extend(row['url'] for row in page)
+                if cursor is None:
+                    break
+            self.assertEqual(sorted(seen), sorted(f'https://www.example.com/{number}' for number in range(7)))
+            self.assertEqual(len(seen), 7)
+
+    def test_projection_and_ndjson_stream(self):
+        """fields= lässt Textkörper weg; format=ndjson streamt eine JSON-Zeile pro Treffer."""
+        page = self.search(query='vertrag', search_field='all', fields='url,score', limit=2)
+        self.assertEqual([sorted(row) for row in page], [['score', 'url'], ['score', 'url']])
+
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content', query_string={'query': 'vertrag', 'search_field': 'text_content', 'format': 'ndjson', 'fields': 'title,snippet'},
+                                                 headers={'X-API-Key': 'test-key'})
+            lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(lines), 7)
+        self.assertIn('<mark>Vertrag</mark>', json.loads(lines[0])['snippet'])
+
+        with patch('app.API_KEYS', {'test-key'}):
+            response = app.app.test_client().get('/api/v1/search-content?query=vertrag&cursor=kaputt', headers={'X-API-Key': 'test-key'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestConnectionPool(StorageTestCase):
+
+    def test_connections_are_reused_per_thread_in_wal_mode(self):
+        """Jeder Thread erhält seine eigene, wiederverwendete Verbindung im WAL-Modus."""
+        first = app.connect_db()
+        first.close()
+        second = app.connect_db()
+        second.close()
+        self.assertIs(first, second)
+        self.assertEqual(first.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+        other_thread = []
+        thread = threading.Thread(target=lambda: other_thread.append(app.connect_db()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_thread[0], first)
+
+    def test_concurrent_writers_do_not_fail(self):
+        """32 gleichzeitige Schreiber speichern ohne 'database is locked'."""
+        results = []
+
+        def write(number):
+            for page in range(5):
+                results.append(app.save_to_db(f'https://www.example.com/{number}/{page}', 'example.com', f'Seite {number}', None, None, None,
+                                              f'<p>{number} {page}</p>', f'Vertrag {number} {page}', None, keyword_text=f'Vertrag {number} {page}'))
+
+        threads = [threading.Thread(target=write, args=(number,)) for number in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 160)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM web_content")[0][0], 160)
+        self.assertEqual(self.query("SELECT df FROM term_document_frequency WHERE term = 'vertrag'")[0][0], 160)
+
+
+class TestWriteBehind(StorageTestCase):
+
+    def record(self, number, **overrides):
+        return {'url': f'https://www.example.com/{number}', 'domain': 'example.com', 'title': f'Seite {number}', 'meta_description': None,
+                'h1_headings': None, 'keywords': None, 'html_content': f'<p>{number}</p>', 'text_content': f'Vertrag {number}',
+                'processed_content': None, 'keyword_text': f'Vertrag {number}', **overrides}
+
+    def test_concurrent_writes_are_grouped_into_transactions(self):
+        """Gleichzeitige Schreibvorgänge (Inhalte und Task-Status) landen gemeinsam in wenigen Transaktionen."""
+        writer = app.WriteBehindWriter({**app.WRITE_BEHIND_CONFIG, 'flush_interval_ms': 50})
+        self.addCleanup(writer.shutdown)
+        self.create_task()
+        futures = [writer.submit('content', self.record(number)) for number in range(40)]
+        futures.append(writer.submit('task_running', ('running', 'task-1')))
+        self.assertEqual([future.result(timeout=10) for future in futures], [True] * 41)
+        self.assertLess(writer.stats()['transactions'], 5)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM web_content")[0][0], 40)
+        self.assertEqual(self.query("SELECT status FROM scheduled_tasks WHERE id = 'task-1'")[0][0], 'running')
+
+    def test_failed_entry_does_not_fail_the_batch(self):
+        """Schlägt ein Eintrag fehl, wird der Rest einzeln geschrieben; nur das fehlerhafte Future liefert False."""
+        writer = app.WriteBehindWriter({**app.WRITE_BEHIND_CONFIG, 'flush_interval_ms': 200})
+        self.addCleanup(writer.shutdown)
+        futures = [writer.submit('content', self.record(1)), writer.submit('content', self.record(2, h1_headings={object()})),
+                   writer.submit('content', self.record(3))]
+        self.assertEqual([future.result(timeout=10) for future in futures], [True, False, True])
+        self.assertEqual(writer.stats()['failed'], 1)
+
+    def test_shutdown_flushes_pending_writes(self):
+        """Beim Herunterfahren werden alle wartenden Einträge geschrieben, bevor der Thread endet."""
+        writer = app.WriteBehindWriter({**app.WRITE_BEHIND_CONFIG, 'flush_interval_ms': 60000, 'batch_size': 1000})
+        futures = [writer.submit('content', self.record(number)) for number in range(5)]
+        writer.shutdown()
+        self.assertTrue(all(future.done() and future.result() for future in futures))
+        self.assertEqual(self.query("SELECT COUNT(*) FROM web_content")[0][0], 5)
+        self.assertTrue(writer.submit('content', self.record(6)).result()) # Nach dem Shutdown wird direkt geschrieben
+
+
+class TestKeywordDocumentFrequency(StorageTestCase):
+
+    def document_frequency(self):
+        return dict(self.query("SELECT term, df FROM term_document_frequency"))
+
+    def test_incremental_updates_match_rebuild(self):
+        """Einfügen, Ersetzen und Batch-Speichern halten die Dokumenthäufigkeit konsistent mit einem Neuaufbau."""
+        app.save_to_db('https://www.example.com/a', 'example.com', 'A', None, None, None, '<p>a</p>', 'Vertrag Angebot', None, keyword_text='Vertrag Angebot')
+        app.save_to_db('https://www.example.com/b', 'example.com', 'B', None, None, None, '<p>b</p>', 'Vertrag Kündigung', None, keyword_text='Vertrag Kündigung')
+        self.assertEqual(self.document_frequency(), {'vertrag': 2, 'angebot': 1, 'kündigung': 1})
+
+        app.save_to_db('https://www.example.com/a', 'example.com', 'A', None, None, None, '<p>a</p>', 'Vertrag Annahme', None, keyword_text='Vertrag Annahme')
+        records = [{'url': 'https://www.example.com/c', 'domain': 'example.com', 'title': 'C', 'meta_description': None, 'h1_headings': None, 'keywords': None,
+                    'html_content': '<p>c</p>', 'text_content': text, 'processed_content': None, 'keyword_text': text}
+                   for text in ('Frist Vertrag', 'Frist')]
+        app.save_many_to_db(records)
+        incremental = self.document_frequency()
+        self.assertEqual(incremental, {'vertrag': 2, 'annahme': 1, 'kündigung': 1, 'frist': 1})
+        self.assertEqual(self.query("SELECT value FROM keyword_corpus WHERE key = 'documents'")[0][0], 3)
+
+        self.assertEqual(app.rebuild_document_frequency(), {'documents': 3, 'terms': 4})
+        self.assertEqual(self.document_frequency(), incremental)
+
+    def test_tfidf_demotes_corpus_wide_terms(self):
+        """Im TF-IDF-Modus treten Begriffe zurück, die in fast allen Seiten vorkommen."""
+        for number in range(4):
+            text = f'Gesetz Gesetz Gesetz Paragraph{"abcd"[number]}'
+            app.save_to_db(f'https://www.example.com/{number}', 'example.com', None, None, None, None, '<p>x</p>', text, None, keyword_text=text)
+        text = 'Gesetz Gesetz Gesetz Kaufvertrag Kaufvertrag'
+        self.assertEqual(app.extract_keywords(text, top_n=1), ['gesetz'])
+        with patch.dict('app.KEYWORD_CONFIG', {'scoring': 'tfidf', 'min_corpus_documents': 3}):
+            self.assertEqual(app.extract_keywords(text, top_n=1), ['kaufvertrag'])
+            self.assertEqual(app.keyword_engine.extract_many([text, ''], 1, None, app.keyword_idf_lookup()), [['kaufvertrag'], []])
+        with patch.dict('app.KEYWORD_CONFIG', {'scoring': 'tfidf', 'min_corpus_documents': 50}):
+            self.assertEqual(app.extract_keywords(text, top_n=1), ['gesetz'])
+
+
+class TestPageSnapshots(StorageTestCase):
+
+    def page(self, version):
+        rows = ''.join(f'<div class="row"><p>Paragraph {number}: Der Vertrag kommt durch Angebot und Annahme zustande.</p></div>' for number in range(300))
+        return f'<html><body><h1>Fassung {version}</h1>{rows}</body></html>'
+
+    def save(self, html):
+        app.save_to_db(self.url, 'example.com', 'Gesetz', None, None, None, html, None, None)
+
+    def test_versions_are_stored_as_deltas_between_keyframes(self):
+        """Unveränderte Abrufe erzeugen keine Version; jede Version lässt sich aus Keyframe und Deltas exakt rekonstruieren."""
+        pages = [self.page(version) for version in range(5)]
+        with patch.dict('app.SNAPSHOT_CONFIG', {'keyframe_interval': 3}):
+            self.save(pages[0])
+            self.save(pages[0])
+            for html in pages[1:]:
+                self.save(html)
+        versions = app.list_page_snapshots(self.url)
+        self.assertEqual([(row['version'], row['kind']) for row in versions], [(1, 'keyframe'), (2, 'delta'), (3, 'delta'), (4, 'keyframe'), (5, 'delta')])
+        self.assertLess(versions[1]['stored_bytes'], 200)
+        app.migrate_storage() # Keyframe-Blobs sind referenziert und bleiben erhalten
+        for version, html in enumerate(pages, start=1):
+            self.assertEqual(app.get_page_snapshot(self.url, version)['html_content'], html)
+
+    def test_delta_is_computed_outside_the_write_transaction(self):
+        """Der Vergleich läuft im aufrufenden Thread, nicht im Schreib-Thread unter BEGIN IMMEDIATE."""
+        self.save(self.page(1))
+        threads = []
+        original = app.encode_snapshot_delta
+        with patch('app.encode_snapshot_delta', side_effect=lambda *args: threads.append(threading.current_thread().name) or original(*args)):
+            self.save(self.page(2))
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], 'write-behind')
+        self.assertEqual([row['kind'] for row in app.list_page_snapshots(self.url)], ['keyframe', 'delta'])
+        self.assertEqual(app.get_page_snapshot(self.url, 2)['html_content'], self.page(2))
+
+    def test_delta_round_trip_on_repetitive_markup(self):
+        """Viele gleichartige Tags: Delta bleibt klein und rekonstruiert die neue Fassung exakt."""
+        base = '<table>' + ''.join(f'<tr><td>{number}</td><td><a href="/x/{number}">Link</a></td></tr>' for number in range(3000)) + '</table>'
+        changed = base.replace('<td>10</td>', '<td>zehn</td>').replace('<td>2500</td>', '<td>2500</td><td>neu</td>')
+        delta = app.encode_snapshot_delta(base, changed)
+        self.assertEqual(app.apply_snapshot_delta(base, delta), changed)
+        self.assertLess(len(delta), 200)
+
+    def test_snapshot_api(self):
+        """Versionen auflisten, einzeln abrufen und vergleichen."""
+        self.save(self.page(1))
+        self.save(self.page(2))
+        client = app.app.test_client()
+        with patch('app.API_KEYS', {'test-key'}):
+            listing = client.get('/api/v1/snapshots', query_string={'url': self.url}, headers={'X-API-Key': 'test-key'}).get_json()['data']
+            first = client.get('/api/v1/snapshots/1', query_string={'url': self.url}, headers={'X-API-Key': 'test-key'}).get_json()['data']
+            diff = client.get('/api/v1/snapshots/diff', query_string={'url': self.url}, headers={'X-API-Key': 'test-key'}).get_json()['data']
+            missing = client.get('/api/v1/snapshots', query_string={'url': 'https://www.example.com/unbekannt'}, headers={'X-API-Key': 'test-key'})
+        self.assertEqual([row['version'] for row in listing['versions']], [1, 2])
+        self.assertEqual(first['html_content'], self.page(1))
+        self.assertEqual((diff['from'], diff['to']), (1, 2))
+        self.assertIn('\n-Fassung 1</h1>\n+Fassung 2</h1>\n', diff['diff'])
+        self.assertEqual(missing.status_code, 404)
+
+
+class TestRenderModes(StorageTestCase):
+
+    SPA_HTML = "<html><head><title>App</title></head><body><div id='root'></div><script src='/app.js'></script></body></html>"
+
+    def setUp(self):
+        super().setUp()
+        self.etag = None
+        self.spa_hits = 0
+
+        async def spa(request):
+            self.spa_hits += 1
+            return web.Response(text=self.SPA_HTML, content_type='text/html')
+
+        self.spa_server = LocalTestServer([web.get('/app', spa)]).start()
+        self.addCleanup(self.spa_server.stop)
+        self.spa_url = self.spa_server.url('/app')
+        self.browser = MagicMock()
+        self.browser.render.return_value = "<html><head><title>App</title></head><body><h1>Gerendert</h1></body></html>"
+        for patcher in (patch('app.selenium_pool', self.browser), patch('app.render_modes', app.RenderModeStore(app.RENDER_DETECTION_CONFIG))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_spa_shell_is_learned_and_persisted(self):
+        """Wiederholte JavaScript-Hüllen werden gerendert und der Domain gemerkt; danach entfällt der aiohttp-Abruf."""
+        min_shell_pages = app.RENDER_DETECTION_CONFIG['min_shell_pages']
+        for _ in range(min_shell_pages + 1):
+            self.assertIn('Gerendert', app.fetch_webpage_content(self.spa_url))
+        self.assertEqual(self.spa_hits, min_shell_pages)
+        self.assertEqual(self.browser.render.call_count, min_shell_pages + 1)
+        domain = self.spa_url.split('/')[2]
+        self.assertEqual(self.query("SELECT mode, reason FROM render_modes WHERE domain = ?", (domain,)), [('browser', 'spa_marker')])
+        self.assertEqual(app.RenderModeStore(app.RENDER_DETECTION_CONFIG).mode_for(domain), 'browser')
+
+    def test_single_thin_page_does_not_switch_domain(self):
+        """Eine einzelne Hülle oder Weiterleitungsseite stellt die Domain nicht auf 'browser' um."""
+        render_modes = app.RenderModeStore({**app.RENDER_DETECTION_CONFIG, 'min_shell_pages': 2})
+        self.assertEqual(render_modes.record('spa.example.com', self.SPA_HTML), 'spa_marker')
+        self.assertEqual(render_modes.mode_for('spa.example.com'), 'auto')
+        self.assertIsNone(render_modes.record('spa.example.com', self.SPA_HTML, status=203))
+        self.assertIsNone(render_modes.detect_shell("<html><head><meta http-equiv='refresh' content='0; url=/neu'></head><body></body></html>"))
+        self.assertEqual(render_modes.record('spa.example.com', self.SPA_HTML), 'spa_marker')
+        self.assertEqual(render_modes.mode_for('spa.example.com'), 'browser')
+
+    def test_batch_and_crawl_use_learned_mode(self):
+        """Batch-Abrufe und Crawls rendern Domains im Modus 'browser' direkt über den Browser-Pool."""
+        app.render_modes.remember(self.spa_url.split('/')[2], 'browser', 'spa_marker')
+        self.assertEqual(self.engine.run(app.async_fetch_batch([self.spa_url])), [self.browser.render.return_value])
+        summary = app.crawl_site(self.spa_url, app.CrawlOptions(max_depth=0))
+        self.assertEqual((summary['pages_stored'], self.spa_hits, self.browser.render.call_count), (1, 0, 2))
+
+    def test_browser_renders_use_host_slot(self):
+        """Browser-Abrufe laufen durch den Höflichkeits-Scheduler: Parallelitätslimit pro Host gilt auch für Chrome."""
+        scheduler = app.HostPolitenessScheduler({**app.POLITENESS_CONFIG, 'enabled': True, 'requests_per_second': 0, 'min_delay': 0.0,
+                                                 'max_concurrent_per_host': 1, 'domains': {}})
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def render(url):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return "<html><body><h1>Gerendert</h1></body></html>"
+
+        self.browser.render.side_effect = render
+        domain = self.spa_url.split('/')[2]
+        app.render_modes.remember(domain, 'browser', 'spa_marker')
+        with patch('app.host_politeness', scheduler):
+            self.engine.run(app.async_fetch_batch([self.spa_url + f'?seite={number}' for number in range(3)]))
+            app.fetch_page(self.spa_url)
+        self.assertEqual(peak[0], 1)
+        self.assertEqual(scheduler.stats()[domain]['requests'], 4)
+
+    def test_regular_page_stays_on_http(self):
+        """Seiten mit Inhalt werden als 'http' gelernt und nie gerendert."""
+        self.page_html = TEST_HTML.replace('<p>', '<p>' + 'Text ' * 60)
+        app.fetch_webpage_content(self.url)
+        self.browser.render.assert_not_called()
+        self.assertEqual(self.query("SELECT mode FROM render_modes"), [('http',)])
+
+    def test_task_override(self):
+        """Ein Task mit render_mode 'http' rendert nie, 'browser' überspringt aiohttp."""
+        app.save_scheduled_task_to_db({'id': 'spa-http', 'url': self.spa_url, 'schedule_time': 'stündlich', 'render_mode': 'http'})
+        function, kwargs = app.get_task_runner(app.get_scheduled_task_from_db('spa-http'))
+        function(**kwargs)
+        self.browser.render.assert_not_called()
+        self.assertEqual(app.fetch_page(self.url, render_mode='browser')['content'], self.browser.render.return_value)
+        self.assertEqual(len(self.requests_seen), 0)
+        # Crawl-Task mit 'http': auch eine als 'browser' gelernte Domain wird nicht gerendert
+        app.render_modes.remember(self.spa_url.split('/')[2], 'browser', 'spa_marker')
+        app.save_scheduled_task_to_db({'id': 'spa-crawl', 'url': self.spa_url, 'schedule_time': 'stündlich', 'task_type': 'crawl',
+                                       'crawl_options': '{"max_depth": 0}', 'render_mode': 'http'})
+        function, kwargs = app.get_task_runner(app.get_scheduled_task_from_db('spa-crawl'))
+        self.assertEqual(kwargs['render_mode'], 'http')
+        function(**kwargs)
+        self.browser.render.assert_called_once()
+        self.assertEqual(self.spa_hits, 2)
+
+
+class TestRepository(StorageTestCase):
+
+    def test_helpers_and_api_go_through_repository(self):
+        """Task-, Inhalts-, Such- und Health-Zugriffe laufen über das konfigurierte Repository."""
+        fake = MagicMock()
+        fake.load_tasks.return_value = [{'id': 't1'}]
+        fake.health.return_value = True
+        fake.search.return_value = iter([{'url': 'https://www.example.com/a'}, ('next', (None, 1))])
+        with patch('app.repository', fake), patch('app.API_KEYS', {'test-key'}):
+            self.assertEqual(app.load_scheduled_tasks(), [{'id': 't1'}])
+            app.save_many_to_db([{'url': 'https://www.example.com/a'}])
+            response = app.app.test_client().get('/api/v1/search-content', query_string={'query': 'example', 'fields': 'url', 'limit': 1},
+                                                 headers={'X-API-Key': 'test-key'})
+            app.app.test_client().get('/api/v1/health', headers={'X-API-Key': 'test-key'})
+        fake.save_content_batch.assert_called_once_with([{'url': 'https://www.example.com/a'}])
+        fake.search.assert_called_once_with('url', 'example', ['url'], None, 1)
+        fake.health.assert_called_once_with()
+        body = response.get_json()
+        self.assertEqual(body['data'], [{'url': 'https://www.example.com/a'}])
+        self.assertIsNotNone(body['pagination']['next_cursor'])
+
+    def test_sqlite_only_features_are_rejected_with_postgresql(self):
+        """Versionshistorie und TF-IDF werden nur beim Speichern in SQLite gepflegt und sind mit PostgreSQL abgeschaltet."""
+        client = app.app.test_client()
+        with patch('app.DATABASE_TYPE', 'postgresql'), patch('app.API_KEYS', {'test-key'}):
+            snapshots = client.get('/api/v1/snapshots', query_string={'url': self.url}, headers={'X-API-Key': 'test-key'})
+            keywords = client.post('/api/v1/keywords', json={'texts': ['Vertrag'], 'scoring': 'tfidf'}, headers={'X-API-Key': 'test-key'})
+            self.assertIsNone(app.keyword_idf_lookup('tfidf'))
+        self.assertEqual(snapshots.status_code, 501)
+        self.assertEqual(keywords.status_code, 400)
+
+
+@unittest.skipUnless(app.psycopg2 is not None and os.getenv('WEBCRAWLER_TEST_POSTGRES_DSN'),
+                     "PostgreSQL-Tests benötigen psycopg2 und WEBCRAWLER_TEST_POSTGRES_DSN (eigene Testdatenbank, Tabellen werden gelöscht)")
+class TestPostgreSQLRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = app.PostgreSQLRepository(os.getenv('WEBCRAWLER_TEST_POSTGRES_DSN'), {**app.POSTGRESQL_CONFIG, 'max_connections': 4})
+        self.addCleanup(self.repository.close)
+        with self.repository.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS web_content, scheduled_tasks")
+        self.repository.init_schema()
+
+    def record(self, path, title, text):
+        return {'url': 'https://www.example.com' + path, 'domain': 'example.com', 'title': title, 'meta_description': None, 'h1_headings': ['Kopf'],
+                'keywords': None, 'html_content': f'<p>{text}</p>', 'text_content': text, 'processed_content': None}
+
+    def test_tasks_round_trip(self):
+        """Tasks anlegen, ändern, Status setzen und löschen."""
+        self.assertTrue(self.repository.save_task({'id': 't1', 'url': 'https://www.example.com', 'schedule_time': 'stündlich', 'text_only': True}))
+        self.assertTrue(self.repository.update_task('t1', {'schedule_time': 'alle 5 minuten'}))
+        self.assertTrue(self.repository.write_statement(app.TASK_RUNNING_STATUS_SQL, ('running', 't1')))
+        task = self.repository.get_task('t1')
+        self.assertEqual((task['schedule_time'], task['status'], task['text_only']), ('alle 5 minuten', 'running', True))
+        self.assertEqual([task['id'] for task in self.repository.load_tasks()], ['t1'])
+        self.assertTrue(self.repository.delete_task('t1'))
+        self.assertIsNone(self.repository.get_task('t1'))
+
+    def test_copy_batch_and_ranked_search(self):
+        """COPY-Batch mit Sonderzeichen und doppelter URL, gewichtete Volltextsuche und Keyset-Pagination."""
+        records = [self.record('/a', 'Alt', 'veraltet'), self.record('/b', 'Kaufvertrag', 'Tab\tZeile\nBackslash\\ Ende'),
+                   self.record('/a', 'Neu', 'Der Kaufvertrag kommt zustande'), self.record('/c', 'Miete', 'Mietvertrag und Kaufvertrag')]
+        self.assertTrue(self.repository.save_content_batch(records))
+        self.assertTrue(self.repository.save_content(self.record('/d', 'Pacht', 'Pachtvertrag\x00')))
+        self.assertEqual(self.repository.get_fetch_validators('https://www.example.com/a')['content_hash'], app.compute_content_hash('<p>Der Kaufvertrag kommt zustande</p>'))
+        results = [result for result in self.repository.search('all', 'kaufvertrag', ['url', 'title', 'text_content', 'score']) if not isinstance(result, tuple)]
+        self.assertEqual(results[0]['title'], 'Kaufvertrag') # Titeltreffer vor Texttreffern
+        self.assertEqual(results[0]['text_content'], 'Tab\tZeile\nBackslash\\ Ende')
+        self.assertEqual(len(results), 3)
+        paged, after = [], None
+        while True:
+            page = list(self.repository.search('text_content', 'kaufvertrag', ['url', 'snippet'], after, 1))
+            paged += [result['url'] for result in page if not isinstance(result, tuple)]
+            if not isinstance(page[-1], tuple):
+                break
+            after = page[-1][1]
+        self.assertEqual(sorted(paged), ['https://www.example.com/a', 'https://www.example.com/c'])
+        self.assertEqual([result['url'] for result in self.repository.search('url', '/d', ['url'])], ['https://www.example.com/d'])
+        self.assertTrue(self.repository.health())
+
+
+class TestTaskExecutor(StorageTestCase):
+
+    def test_bounded_pool_skips_running_tasks_and_rejects_when_full(self):
+        """Höchstens max_workers gleichzeitig, eine Ausführung pro Task-ID, volle Queue verwirft statt Threads zu starten."""
+        executor = app.TaskExecutor({'max_workers': 1, 'queue_size': 1})
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        started = threading.Event()
+        calls = []
+
+        def task(task_id):
+            calls.append(task_id)
+            started.set()
+            release.wait(5)
+
+        self.assertEqual(executor.submit('a', task, {'task_id': 'a'}), 'queued')
+        self.assertTrue(started.wait(5))
+        self.assertEqual(executor.submit('a', task, {'task_id': 'a'}), 'running')
+        self.assertEqual(executor.submit('b', task, {'task_id': 'b'}), 'queued')
+        self.assertEqual(executor.submit('c', task, {'task_id': 'c'}), 'full')
+        stats = executor.stats()
+        self.assertEqual((stats['active'], stats['queued'], stats['workers']), (1, 1, 1))
+        self.assertEqual((stats['skipped_running'], stats['rejected_full']), (1, 1))
+        threading.Event().wait(0.05) # 'b' wartet messbar auf den einzigen Worker
+        release.set()
+        for _ in range(100):
+            if executor.stats()['completed'] == 2:
+                break
+            threading.Event().wait(0.05)
+        stats = executor.stats()
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual((stats['completed'], stats['queued'], stats['active']), (2, 0, 0))
+        self.assertGreaterEqual(stats['max_wait_seconds'], 0.05)
+        self.assertFalse(executor.is_running('a'))
+
+    def test_shutdown_waits_for_running_tasks_and_marks_stragglers(self):
+        """Beim Beenden werden laufende Tasks abgewartet; wer das Zeitlimit überschreitet, bleibt nicht auf 'running'."""
+        executor = app.TaskExecutor({'max_workers': 2, 'queue_size': 5, 'shutdown_timeout': 0.5})
+        release = threading.Event()
+        finished = []
+        executor.submit('kurz', lambda: (threading.Event().wait(0.1), finished.append('kurz')), {})
+        executor.submit('haengt', release.wait, {'timeout': 5})
+        threading.Event().wait(0.05)
+        with patch('app.update_scheduled_task_running_status_db') as mock_status:
+            executor.shutdown()
+        release.set()
+        self.assertEqual(finished, ['kurz'])
+        mock_status.assert_called_once_with('haengt', 'failure - interrupted')
+        self.assertEqual(executor.submit('kurz', print, {}), 'stopped')
+
+    def test_run_endpoint_uses_executor(self):
+        """Manuelle Ausführung über die API wird in den Pool eingereiht; eine laufende Ausführung ergibt 409."""
+        task_id = self.create_task()
+        executor = MagicMock()
+        executor.is_running.return_value = False
+        executor.submit.return_value = 'queued'
+        client = app.app.test_client()
+        with patch('app.task_executor', executor), patch('app.API_KEYS', {'test-key'}):
+            response = client.post(f'/api/v1/scheduled-tasks/{task_id}/run', headers={'X-API-Key': 'test-key'})
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(executor.submit.call_args[0][:2], (task_id, app.scrape_and_store_url))
+            executor.is_running.return_value = True
+            response = client.post(f'/api/v1/scheduled-tasks/{task_id}/run', headers={'X-API-Key': 'test-key'})
+            self.assertEqual(response.status_code, 409)
+        self.assertEqual(executor.submit.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()